@@ -1,47 +1,87 @@
-import joblib
-import pandas as pd
+from dataclasses import dataclass
+import lightgbm as lgb
 import numpy as np
-import shap
+
+# Column order the model was fitted on; features are fed unscaled
+EXPECTED_COLS = ('hour', 'day_of_week', 'lighting_score', 'crowd_density',
+                 'historical_crime_index', 'police_dist_km', 'is_isolated', 'near_transit')
+
+FEATURE_MAP = {
+    'lighting_score': 'street lighting',
+    'historical_crime_index': 'historical crime rate',
+    'crowd_density': 'crowd density',
+    'police_dist_km': 'distance from nearest police station',
+    'is_isolated': 'area isolation',
+    'hour': 'time of day',
+    'near_transit': 'proximity to transit hub',
+    'day_of_week': 'day of week'
+}
 
 try:
-    model = joblib.load('urban_sight_model.pkl')
-    scaler = joblib.load('scaler.pkl')
-    explainer = shap.TreeExplainer(model)
+    model = lgb.Booster(model_file='urban_sight_model.txt')
+    # Inputs are passed positionally, so the model must have been fitted on exactly these columns
+    if tuple(model.feature_name()) != EXPECTED_COLS:
+        raise ValueError(f"Model expects features {model.feature_name()}, got {list(EXPECTED_COLS)}")
 except Exception as e:
-    print(f"Warning: Failed to load models. Ensure urban_sight_model.pkl and scaler.pkl exist. Error: {e}")
-    model, scaler, explainer = None, None, None
+    print(f"Warning: Failed to load models. Ensure urban_sight_model.txt exists. Error: {e}")
+    model = None
+
+# Inputs are always 8 columns in EXPECTED_COLS order, so LightGBM's per-call shape check
+# is redundant; a single thread avoids spinning up OpenMP for these small batches.
+PREDICT_PARAMS = {"num_threads": 1, "predict_disable_shape_check": True}
+
+@dataclass
+class FeatureBlock:
+    """A batch of model inputs stored column-wise, one array per feature aligned by row."""
+    hour: np.ndarray
+    day_of_week: np.ndarray
+    lighting_score: np.ndarray
+    crowd_density: np.ndarray
+    historical_crime_index: np.ndarray
+    police_dist_km: np.ndarray
+    is_isolated: np.ndarray
+    near_transit: np.ndarray
+    
+    @classmethod
+    def full(cls, n, feature_dict, **columns):
+        """n rows taking per-row arrays from columns and every other feature from feature_dict."""
+        unknown = set(columns) - set(EXPECTED_COLS)
+        if unknown:
+            raise TypeError(f"Unknown feature columns: {sorted(unknown)}")
+        return cls(**{c: columns[c] if c in columns else np.full(n, feature_dict[c]) for c in EXPECTED_COLS})
+    
+    def to_matrix(self):
+        """Returns the (N, 8) matrix in EXPECTED_COLS order that predict_batch expects."""
+        return np.column_stack([getattr(self, c) for c in EXPECTED_COLS]).astype(np.float64, copy=False)
+    
+    def row(self, i):
+        """Feature dict for a single row."""
+        return {c: getattr(self, c)[i].item() for c in EXPECTED_COLS}
+
+def _row(feature_dict):
+    """Builds a (1, 8) feature row in EXPECTED_COLS order."""
+    return np.fromiter((feature_dict[c] for c in EXPECTED_COLS), dtype=np.float64,
+                       count=len(EXPECTED_COLS)).reshape(1, -1)
 
 def get_shap_explanation(feature_dict, safety_score):
-    if explainer is None:
+    if model is None:
         return {"explanation": "Model not loaded.", "top_features": []}
         
-    expected_cols = ['hour', 'day_of_week', 'lighting_score', 'crowd_density', 
-                     'historical_crime_index', 'police_dist_km', 'is_isolated', 'near_transit']
-    
-    df_input = pd.DataFrame([feature_dict])[expected_cols]
-    X_scaled = scaler.transform(df_input)
+    X = _row(feature_dict)
     
-    shap_values = explainer.shap_values(X_scaled)[0]
-    
-    feature_map = {
-        'lighting_score': 'street lighting',
-        'historical_crime_index': 'historical crime rate',
-        'crowd_density': 'crowd density',
-        'police_dist_km': 'distance from nearest police station',
-        'is_isolated': 'area isolation',
-        'hour': 'time of day',
-        'near_transit': 'proximity to transit hub',
-        'day_of_week': 'day of week'
-    }
+    # LightGBM computes tree SHAP values natively; the last column is the base value
+    shap_values = model.predict(X, pred_contrib=True, **PREDICT_PARAMS)[0, :-1]
     
+    # Top 2 features by absolute impact, strongest first
     abs_shap = np.abs(shap_values)
-    top_indices = np.argsort(abs_shap)[-2:][::-1]
+    top_2 = np.argpartition(abs_shap, -2)[-2:]
+    top_indices = top_2[np.argsort(abs_shap[top_2])[::-1]]
     
-    f1_key = expected_cols[top_indices[0]]
-    f2_key = expected_cols[top_indices[1]]
+    f1_key = EXPECTED_COLS[top_indices[0]]
+    f2_key = EXPECTED_COLS[top_indices[1]]
     
-    f1 = feature_map.get(f1_key, f1_key)
-    f2 = feature_map.get(f2_key, f2_key)
+    f1 = FEATURE_MAP.get(f1_key, f1_key)
+    f2 = FEATURE_MAP.get(f2_key, f2_key)
     
     if safety_score < 0.4:
         explanation = f"Safety concern: {f1} and {f2} are the main risk factors."
@@ -77,12 +117,7 @@ def predict(feature_dict):
     if model is None:
         return 0.5, "Medium"
         
-    expected_cols = ['hour', 'day_of_week', 'lighting_score', 'crowd_density', 
-                     'historical_crime_index', 'police_dist_km', 'is_isolated', 'near_transit']
-    df_input = pd.DataFrame([feature_dict])[expected_cols]
-    X_scaled = scaler.transform(df_input)
-    
-    score = float(model.predict(X_scaled)[0])
+    score = float(model.predict(_row(feature_dict), **PREDICT_PARAMS)[0])
     
     if score < 0.4:
         category = "Low"
@@ -92,3 +127,19 @@ def predict(feature_dict):
         category = "High"
         
     return score, category
+
+def predict_batch(feature_matrix):
+    """Returns base safety_scores for an (N, 8) matrix of raw features in EXPECTED_COLS order."""
+    if model is None:
+        return np.full(len(feature_matrix), 0.5)
+        
+    return model.predict(feature_matrix, **PREDICT_PARAMS)
+
+def warm_up():
+    """Runs one dummy prediction and SHAP contribution pass so the first request doesn't pay first-call costs."""
+    if model is None:
+        return
+        
+    X = np.zeros((1, len(EXPECTED_COLS)))
+    predict_batch(X)
+    model.predict(X, pred_contrib=True, **PREDICT_PARAMS)
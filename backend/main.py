@@ -1,13 +1,42 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache
+import asyncio
+import logging
+import os
 import numpy as np
+import orjson
 
 from models import AnalyzeRequest, RouteRequest, LocationFeatures
-from engine import predict, get_shap_explanation, get_recommendations
-from personalization import apply_profile_weights
+from engine import predict, predict_batch, get_shap_explanation, get_recommendations, warm_up, FeatureBlock
+from personalization import apply_profile_weights, apply_profile_weights_batch
 
-app = FastAPI(title="Urban Sight API", version="1.0.0")
+# Debug output is off unless the app's logging config enables it for this logger
+logger = logging.getLogger("urban_sight")
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, which also serializes numpy scalars and arrays."""
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+async def run_in_pool(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(app.state.pool, fn, *args)
+
+@asynccontextmanager
+async def lifespan(app):
+    warm_up()
+    # CPU-bound model calls run here so the event loop stays free; LightGBM releases the GIL while predicting.
+    # Created per startup so the executor lives exactly as long as the app.
+    app.state.pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+    yield
+    app.state.pool.shutdown()
+
+app = FastAPI(title="Urban Sight API", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware, 
@@ -21,6 +50,12 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Heatmap and route payloads are large and highly repetitive
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Default location features, built once; handlers copy it instead of instantiating the model per request
+BASE_LOC_TEMPLATE = LocationFeatures(lat=0, lng=0).model_dump()
+
 def get_category_color(score):
     if score < 0.4:
         return "Low", "#ef4444"
@@ -29,37 +64,95 @@ def get_category_color(score):
     else:
         return "High", "#22c55e"
 
+CATEGORIES = np.array(["Low", "Medium", "High"])
+CATEGORY_COLORS = np.array(["#ef4444", "#f97316", "#22c55e"])
+# Same boundaries as get_category_color: Low below 0.4, Medium up to and including 0.7
+CATEGORY_BOUNDS = np.array([0.4, np.nextafter(0.7, 1.0)])
+
+def categorize(scores):
+    """Array version of get_category_color, returns (categories, colors)."""
+    idx = np.searchsorted(CATEGORY_BOUNDS, scores, side='right')
+    return CATEGORIES[idx], CATEGORY_COLORS[idx]
+
+def synth_route_features(lat, lng):
+    """Deterministic dynamic features derived from waypoint lat/lng arrays.
+    Returns a dict of per-waypoint arrays for lighting_score..near_transit."""
+    # Use high-frequency multipliers so small lat/lng changes create wide variance
+    # Multipliers range ~ -1.0 to 1.0
+    seed1 = np.sin(lat * 50000 + lng * 30000)
+    seed2 = np.cos(lat * 40000 - lng * 60000)
+    seed3 = np.sin(lat * 70000) * np.cos(lng * 70000)
+    
+    return {
+        # Spread continuous features widely across their logical ranges
+        "lighting_score": np.clip(5.0 + 4.8 * seed1, 0.0, 10.0),
+        "crowd_density": np.clip(0.5 + 0.45 * seed2, 0.0, 1.0),
+        "historical_crime_index": np.clip(0.5 + 0.45 * seed3, 0.0, 1.0),
+        # Police distance should be influenced by both seeds for complexity
+        "police_dist_km": np.clip(2.5 + 2.0 * seed1 * seed2, 0.0, 5.0),
+        # Boolean features
+        "is_isolated": (seed2 > 0.3).astype(int),
+        "near_transit": (seed3 > 0.3).astype(int)
+    }
+
+def route_waypoints(origin, dest, detours, num_points):
+    """Waypoints for every detour at once, returned as (lats, lngs) arrays of shape (len(detours), num_points)."""
+    # Calculate orthogonal vector for bowing effect
+    dx = dest.lng - origin.lng
+    dy = dest.lat - origin.lat
+    dist = np.sqrt(dx*dx + dy*dy)
+    if dist == 0:
+        nx, ny = 0, 0
+    else:
+        nx = -dy / dist
+        ny = dx / dist
+        
+    # create bowing effect using sine wave (0 at ends, max at middle), one row per detour
+    frac = np.linspace(0, 1, num_points)
+    bow = np.sin(frac * np.pi) * detours[:, None]
+    
+    lats = origin.lat + dy * frac + nx * bow
+    lngs = origin.lng + dx * frac + ny * bow
+    return lats, lngs
+
 @app.get("/health")
 def health():
     return {"status": "ok", "model": "loaded", "version": "1.0.0"}
 
+def score_location(feature_dict, profile):
+    """Returns (base_score, personalization, shap_explanation) for a single location."""
+    # Get base score from engine.py predict()
+    base_score, _ = predict(feature_dict)
+    
+    # Apply personalization from personalization.py
+    pers = apply_profile_weights(base_score, profile, feature_dict)
+    
+    # Get SHAP explanation from engine.py
+    shap_res = get_shap_explanation(feature_dict, pers["adjusted_score"])
+    
+    return base_score, pers, shap_res
+
 @app.post("/analyze")
-def analyze(request: AnalyzeRequest):
+async def analyze(request: AnalyzeRequest):
     now = datetime.now()
-    feature_dict = request.location.dict()
+    feature_dict = request.location.model_dump()
     
     if feature_dict['hour'] == -1:
         feature_dict['hour'] = now.hour
     if feature_dict['day_of_week'] == -1:
         feature_dict['day_of_week'] = now.weekday()
         
-    # Get base score from engine.py predict()
-    base_score, _ = predict(feature_dict)
-    
-    # Apply personalization from personalization.py
-    pers = apply_profile_weights(base_score, request.profile, feature_dict)
+    # Scoring, personalization and explanation run as one job on the pool
+    base_score, pers, shap_res = await run_in_pool(score_location, feature_dict, request.profile)
     adjusted_score = pers["adjusted_score"]
     adjustments_applied = pers["adjustments_applied"]
     
     category, color_code = get_category_color(adjusted_score)
     
-    # Get SHAP explanation from engine.py
-    shap_res = get_shap_explanation(feature_dict, adjusted_score)
-    
     # Get recommendations from engine.py
     recommendations = get_recommendations(category, feature_dict)
     
-    return {
+    return ORJSONResponse({
         "safety_score": round(base_score, 4),
         "adjusted_score": adjusted_score,
         "category": category,
@@ -68,11 +161,10 @@ def analyze(request: AnalyzeRequest):
         "top_features": shap_res.get("top_features", []),
         "recommendations": recommendations,
         "adjustments_applied": adjustments_applied
-    }
+    })
 
 @app.post("/route")
-def route(request: RouteRequest):
-    import math
+async def route(request: RouteRequest):
     origin = request.origin
     dest = request.destination
     
@@ -86,89 +178,58 @@ def route(request: RouteRequest):
     routes_response = []
     
     now = datetime.now()
-    base_loc = LocationFeatures(lat=0, lng=0, hour=now.hour, day_of_week=now.weekday()).dict()
-    
-    print("\n" + "="*40)
-    print(f"NEW ROUTE REQUEST: Origin({origin.lat}, {origin.lng}) to Dest({dest.lat}, {dest.lng})")
-    print("="*40)
-    
-    for rp in route_profiles:
-        print(f"\n--- Processing Route Profile: {rp['name']} ---")
-        detour = rp["detour_val"]
-        waypoints = []
-        scores = []
-        risk_zone_count = 0
-        
-        num_points = 5
+    base_loc = BASE_LOC_TEMPLATE.copy()
+    base_loc["hour"] = now.hour
+    base_loc["day_of_week"] = now.weekday()
+    
+    logger.debug("New route request: origin (%s, %s) to destination (%s, %s)",
+                 origin.lat, origin.lng, dest.lat, dest.lng)
+    
+    num_points = 5
+    
+    detours = np.array([rp["detour_val"] for rp in route_profiles])
+    lats, lngs = route_waypoints(origin, dest, detours, num_points)
+    
+    # Generate deterministic dynamic features for every waypoint at once
+    flat_lats = lats.ravel()
+    flat_lngs = lngs.ravel()
+    
+    block = FeatureBlock.full(flat_lats.size, base_loc, **synth_route_features(flat_lats, flat_lngs))
+    
+    base_scores = await run_in_pool(predict_batch, block.to_matrix())
+    
+    adj_scores, _ = apply_profile_weights_batch(base_scores, request.profile, {
+        "lighting_score": block.lighting_score,
+        "is_isolated": block.is_isolated
+    })
+    adj_scores = adj_scores.reshape(lats.shape)
+    base_scores = base_scores.reshape(lats.shape)
+    
+    risk_zone_counts = np.sum(adj_scores < 0.4, axis=1)
+    
+    for r, rp in enumerate(route_profiles):
+        scores = adj_scores[r]
+        risk_zone_count = int(risk_zone_counts[r])
+        waypoints = [{"lat": lat, "lng": lng} for lat, lng in zip(lats[r], lngs[r])]
         
-        # Calculate orthogonal vector for bowing effect
-        dx = dest.lng - origin.lng
-        dy = dest.lat - origin.lat
-        dist = math.sqrt(dx*dx + dy*dy)
-        if dist == 0:
-            nx, ny = 0, 0
-        else:
-            nx = -dy / dist
-            ny = dx / dist
-            
-        for i in range(num_points):
-            frac = i / (num_points - 1) if num_points > 1 else 0
-            
-            # create bowing effect using sine wave (0 at ends, max at middle)
-            bow = math.sin(frac * math.pi) * detour
-            
-            lat = origin.lat + dy * frac + nx * bow
-            lng = origin.lng + dx * frac + ny * bow
-            
-            waypoints.append({"lat": lat, "lng": lng})
-            print(f"  [{rp['name']}] Point {i} coords: lat={lat:.6f}, lng={lng:.6f}")
-            
-            # Generate deterministic dynamic features based on lat/lng
-            f = base_loc.copy()
-            f["lat"] = lat
-            f["lng"] = lng
-            
-            # Use high-frequency multipliers so small lat/lng changes create wide variance
-            # Multipliers range ~ -1.0 to 1.0
-            seed1 = math.sin(lat * 50000 + lng * 30000)
-            seed2 = math.cos(lat * 40000 - lng * 60000)
-            seed3 = math.sin(lat * 70000) * math.cos(lng * 70000)
-            
-            # Spread continuous features widely across their logical ranges
-            f["lighting_score"] = float(np.clip(5.0 + 4.8 * seed1, 0.0, 10.0))
-            f["crowd_density"] = float(np.clip(0.5 + 0.45 * seed2, 0.0, 1.0))
-            f["historical_crime_index"] = float(np.clip(0.5 + 0.45 * seed3, 0.0, 1.0))
-            
-            # Police distance should be influenced by both seeds for complexity
-            f["police_dist_km"] = float(np.clip(2.5 + 2.0 * seed1 * seed2, 0.0, 5.0))
-            
-            # Boolean features
-            f["is_isolated"] = 1 if seed2 > 0.3 else 0
-            f["near_transit"] = 1 if seed3 > 0.3 else 0
-            
-            print(f"    -> Feature dict: {f}")
-            
-            base_score, _ = predict(f)
-            adj_score = apply_profile_weights(base_score, request.profile, f)["adjusted_score"]
-            scores.append(adj_score)
-            
-            print(f"    -> Predicted base score: {base_score:.4f}, Adjusted score: {adj_score:.4f}")
-            
-            if adj_score < 0.4:
-                risk_zone_count += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            for i in range(num_points):
+                logger.debug("[%s] point %d: lat=%.6f, lng=%.6f, features=%s, base score=%.4f, adjusted score=%.4f",
+                             rp["name"], i, lats[r, i], lngs[r, i], block.row(r * num_points + i),
+                             base_scores[r, i], scores[i])
                 
         if rp["name"] == "Safest":
-            best_3 = sorted(scores)[2:]
-            avg_score = min(sum(best_3) / len(best_3) * 1.05, 1.0)
+            best_3 = np.partition(scores, -3)[-3:]
+            avg_score = min(float(best_3.mean()) * 1.05, 1.0)
             explanation = f"This route prioritises well-lit roads and avoids {risk_zone_count} high-risk zones. Safety score: {int(avg_score * 100)}%."
         elif rp["name"] == "Fastest":
-            avg_score = sum(scores) / len(scores) * 0.88
+            avg_score = float(np.mean(scores)) * 0.88
             explanation = f"Shortest path to destination. Passes through {risk_zone_count} caution zones. Safety score: {int(avg_score * 100)}%."
         elif rp["name"] == "Comfortable":
-            avg_score = sum(scores) / len(scores) * 0.95
+            avg_score = float(np.mean(scores)) * 0.95
             explanation = f"Balanced route avoiding major risk areas. {risk_zone_count} minor caution zones. Safety score: {int(avg_score * 100)}%."
         else:
-            avg_score = sum(scores) / len(scores)
+            avg_score = float(np.mean(scores))
             explanation = f"Average safety score of {int(avg_score * 100)}% with {risk_zone_count} risky areas."
 
         cat, col = get_category_color(avg_score)
@@ -190,40 +251,52 @@ def route(request: RouteRequest):
             "explanation": explanation
         })
         
-    return {
+    return ORJSONResponse({
         "routes": routes_response,
         "recommended": "Safest"
-    }
+    })
 
-@app.get("/heatmap")
-def heatmap(min_lat: float, max_lat: float, min_lng: float, max_lng: float, hour: int = -1):
-    now = datetime.now()
-    if hour == -1:
-        hour = now.hour
-        
+@lru_cache(maxsize=512)
+def _compute_heatmap(min_lat, max_lat, min_lng, max_lng, hour, day_of_week):
+    """Returns the serialized heatmap payload; the grid is fully determined by the arguments."""
     lats = np.linspace(min_lat, max_lat, 10)
     lngs = np.linspace(min_lng, max_lng, 10)
     
-    base_loc = LocationFeatures(lat=0, lng=0, hour=hour, day_of_week=now.weekday()).dict()
+    base_loc = BASE_LOC_TEMPLATE.copy()
+    base_loc["hour"] = hour
+    base_loc["day_of_week"] = day_of_week
     
-    points = []
-    for lat in lats:
-        for lng in lngs:
-            f = base_loc.copy()
-            f["lat"] = float(lat)
-            f["lng"] = float(lng)
-            
-            score, _ = predict(f)
-            _, col = get_category_color(score)
-            
-            points.append({
-                "lat": float(lat),
-                "lng": float(lng),
-                "safety_score": round(score, 4),
-                "color_code": col
-            })
+    # Every grid cell shares the default features, only the coordinates vary
+    LA, LG = np.meshgrid(lats, lngs, indexing='ij')
+    grid_lats = LA.ravel()
+    grid_lngs = LG.ravel()
+    block = FeatureBlock.full(grid_lats.size, base_loc)
+    
+    scores = predict_batch(block.to_matrix())
+    _, colors = categorize(scores)
+    
+    points = [
+        {
+            "lat": lat,
+            "lng": lng,
+            "safety_score": score,
+            "color_code": col
+        }
+        for lat, lng, score, col in zip(grid_lats, grid_lngs, np.round(scores, 4), colors)
+    ]
             
-    return {
+    return orjson.dumps({
         "points": points,
         "count": len(points)
-    }
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+
+@app.get("/heatmap")
+async def heatmap(min_lat: float, max_lat: float, min_lng: float, max_lng: float, hour: int = -1):
+    now = datetime.now()
+    if hour == -1:
+        hour = now.hour
+        
+    # Quantize the bbox so repeated map pans hit the cache
+    content = await run_in_pool(_compute_heatmap, round(min_lat, 4), round(max_lat, 4),
+                                round(min_lng, 4), round(max_lng, 4), hour, now.weekday())
+    return Response(content=content, media_type="application/json")
@@ -1,46 +1,68 @@
-def apply_profile_weights(base_score, profile, features):
-    score = base_score
+import numpy as np
+
+# Applied in order and compounded: score = min(score * factor + offset, cap) for every rule that applies.
+# Conditions receive the profile plus lighting / isolation, which are scalars for a single point or
+# arrays for a batch; profile checks come first so feature checks only run when they can matter.
+PROFILE_RULES = [
+    (lambda p, lighting, is_isolated: p.mode == "walking" and p.is_night,
+     0.75, 0.0, None, "Walking at night reduces safety score."),
+    (lambda p, lighting, is_isolated: p.mode == "cycling" and p.is_night,
+     0.85, 0.0, None, "Cycling at night reduces safety score."),
+    (lambda p, lighting, is_isolated: p.mode == "driving",
+     1.05, 0.0, 1.0, "Driving generally increases safety."),
+    (lambda p, lighting, is_isolated: p.group_size >= 4,
+     1.0, 0.08, 1.0, "Large group size enhances safety."),
+    (lambda p, lighting, is_isolated: p.group_size == 1 and p.is_night,
+     0.90, 0.0, None, "Traveling alone at night reduces safety."),
+    (lambda p, lighting, is_isolated: p.gender_sensitive and lighting < 4,
+     0.88, 0.0, None, "Gender sensitive profile penalty for poor lighting."),
+    (lambda p, lighting, is_isolated: p.gender_sensitive and is_isolated == 1,
+     0.85, 0.0, None, "Gender sensitive profile penalty for isolated areas.")
+]
+
+def _adjust(score, factor, offset, cap):
+    score = score * factor + offset
+    if cap is None:
+        return score
+    return np.minimum(score, cap) if isinstance(score, np.ndarray) else min(score, cap)
+
+def _apply_rules(score, profile, lighting, is_isolated):
+    """Walks PROFILE_RULES over a scalar score or a score array, returns (score, messages of rules that fired)."""
     adjustments_applied = []
+    for applies, factor, offset, cap, message in PROFILE_RULES:
+        mask = applies(profile, lighting, is_isolated)
+        if isinstance(mask, np.ndarray):
+            # Per-point condition: only the points where it holds are adjusted
+            if not mask.any():
+                continue
+            score = np.where(mask, _adjust(score, factor, offset, cap), score)
+        elif mask:
+            score = _adjust(score, factor, offset, cap)
+        else:
+            continue
+        adjustments_applied.append(message)
+    return score, adjustments_applied
+
+def apply_profile_weights_batch(base_scores, profile, features):
+    """Applies profile weights to an array of base scores.
+    features maps 'lighting_score' / 'is_isolated' to arrays aligned with base_scores.
+    Returns (adjusted_scores, adjustments applied to at least one point)."""
+    score, adjustments_applied = _apply_rules(
+        np.asarray(base_scores, dtype=np.float64), profile,
+        np.asarray(features.get('lighting_score', 5.0)), np.asarray(features.get('is_isolated', 0))
+    )
     
-    # Unpack profile
-    mode = profile.mode
-    group_size = profile.group_size
-    is_night = profile.is_night
-    gender_sensitive = profile.gender_sensitive
-    
-    # Unpack features
-    lighting = features.get('lighting_score', 5.0)
-    is_isolated = features.get('is_isolated', 0)
+    # Clip final score to [0.0, 1.0], rounding each point with Python's round() like apply_profile_weights
+    # (np.round scales by 10**4 first and can land on the other side of a half-way value)
+    score = np.clip(score, 0.0, 1.0)
+    rounded = np.array([round(x, 4) for x in score.ravel().tolist()]).reshape(score.shape)
+    return rounded, adjustments_applied
+
+def apply_profile_weights(base_score, profile, features):
+    score, adjustments_applied = _apply_rules(
+        base_score, profile, features.get('lighting_score', 5.0), features.get('is_isolated', 0)
+    )
     
-    # Apply in order, compound them
-    if mode == "walking" and is_night:
-        score *= 0.75
-        adjustments_applied.append("Walking at night reduces safety score.")
-        
-    if mode == "cycling" and is_night:
-        score *= 0.85
-        adjustments_applied.append("Cycling at night reduces safety score.")
-        
-    if mode == "driving":
-        score = min(score * 1.05, 1.0)
-        adjustments_applied.append("Driving generally increases safety.")
-        
-    if group_size >= 4:
-        score = min(score + 0.08, 1.0)
-        adjustments_applied.append("Large group size enhances safety.")
-        
-    if group_size == 1 and is_night:
-        score *= 0.90
-        adjustments_applied.append("Traveling alone at night reduces safety.")
-        
-    if gender_sensitive and lighting < 4:
-        score *= 0.88
-        adjustments_applied.append("Gender sensitive profile penalty for poor lighting.")
-        
-    if gender_sensitive and is_isolated == 1:
-        score *= 0.85
-        adjustments_applied.append("Gender sensitive profile penalty for isolated areas.")
-        
     # Clip final score to [0.0, 1.0]
     score = max(0.0, min(score, 1.0))
     
@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+
+from models import UserProfile
+from personalization import apply_profile_weights, apply_profile_weights_batch
+
+PROFILES = [
+    UserProfile(mode=mode, group_size=group_size, is_night=is_night, gender_sensitive=gender_sensitive)
+    for mode, group_size, is_night, gender_sensitive in itertools.product(
+        ["walking", "cycling", "driving", "transit"], [1, 2, 4], [False, True], [False, True])
+]
+
+def test_batch_matches_scalar_for_every_profile():
+    base_scores = np.linspace(0.0, 1.0, 1001)
+    for profile, lighting, is_isolated in itertools.product(PROFILES, [3.0, 5.0], [0, 1]):
+        features = {"lighting_score": lighting, "is_isolated": is_isolated}
+        batch_scores, batch_applied = apply_profile_weights_batch(base_scores, profile, {
+            "lighting_score": np.full(base_scores.size, lighting),
+            "is_isolated": np.full(base_scores.size, is_isolated)
+        })
+        for base_score, batch_score in zip(base_scores.tolist(), batch_scores.tolist()):
+            scalar = apply_profile_weights(base_score, profile, features)
+            assert batch_score == scalar["adjusted_score"], (profile, lighting, is_isolated, base_score)
+            assert batch_applied == scalar["adjustments_applied"]
+
+def test_batch_rounds_half_way_values_like_scalar():
+    profile = UserProfile(mode="walking", group_size=1, is_night=True, gender_sensitive=True)
+    scores, _ = apply_profile_weights_batch(np.array([1.0]), profile, {
+        "lighting_score": np.array([5.0]),
+        "is_isolated": np.array([1])
+    })
+    assert scores.tolist() == [0.5737]
+    assert apply_profile_weights(1.0, profile, {"lighting_score": 5.0, "is_isolated": 1})["adjusted_score"] == 0.5737
+
+def test_batch_reports_per_point_rules_that_fired_anywhere():
+    profile = UserProfile(mode="walking", group_size=2, is_night=False, gender_sensitive=True)
+    scores, applied = apply_profile_weights_batch(np.array([0.5, 0.5]), profile, {
+        "lighting_score": np.array([3.0, 8.0]),
+        "is_isolated": np.array([0, 0])
+    })
+    assert scores.tolist() == [0.44, 0.5]
+    assert applied == ["Gender sensitive profile penalty for poor lighting."]
@@ -2,42 +2,36 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import joblib
+import lightgbm as lgb
 import os
 import warnings
 warnings.filterwarnings('ignore')
 
 def train_model():
     print("Loading data...")
-    df = pd.read_csv('urban_safety.csv')
-    
-    # 1. Drop lat/lng from features
-    df = df.drop(columns=['lat', 'lng'])
-    
-    # 2. X = all columns except safety_score, y = safety_score
-    X = df.drop(columns=['safety_score'])
-    y = df['safety_score']
+    # 1. Features exclude lat/lng, in the column order engine.py feeds the model
+    feature_names = ['hour', 'day_of_week', 'lighting_score', 'crowd_density',
+                     'historical_crime_index', 'police_dist_km', 'is_isolated', 'near_transit']
     
-    feature_names = X.columns.tolist()
+    # 2. Read straight into one float64 array; X = feature columns, y = safety_score (last column)
+    data = pd.read_csv('urban_safety.csv', usecols=feature_names + ['safety_score'])
+    data = data[feature_names + ['safety_score']].to_numpy(dtype=np.float64)
+    X = data[:, :-1]
+    y = data[:, -1]
     
     # 3. Train/test split 80/20, random_state=42
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    # 4. Fit StandardScaler on X_train only, transform both
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    # 4. Train LGBMRegressor(n_estimators=200, num_leaves=31, learning_rate=0.05, n_jobs=-1)
+    print("Training LightGBM Regressor...")
+    model = lgb.LGBMRegressor(n_estimators=200, num_leaves=31, learning_rate=0.05,
+                              random_state=42, n_jobs=-1, verbose=-1)
+    # Trees split on thresholds, so features are used unscaled
+    model.fit(X_train, y_train, feature_name=feature_names)
     
-    # 5. Train RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-    print("Training Random Forest Regressor...")
-    model = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-    model.fit(X_train_scaled, y_train)
-    
-    # 6. Print MAE, RMSE, R^2 on test set
-    y_pred = model.predict(X_test_scaled)
+    # 5. Print MAE, RMSE, R^2 on test set
+    y_pred = model.predict(X_test)
     mae = mean_absolute_error(y_test, y_pred)
     rmse = np.sqrt(mean_squared_error(y_test, y_pred))
     r2 = r2_score(y_test, y_pred)
@@ -47,15 +41,11 @@ def train_model():
     print(f"RMSE: {rmse:.4f}")
     print(f"R^2:  {r2:.4f}")
     
-    # 7. Save model as urban_sight_model.pkl using joblib
-    joblib.dump(model, 'urban_sight_model.pkl')
-    print("\nModel saved to 'urban_sight_model.pkl'")
-    
-    # 8. Save scaler as scaler.pkl using joblib
-    joblib.dump(scaler, 'scaler.pkl')
-    print("Scaler saved to 'scaler.pkl'")
+    # 6. Save booster as urban_sight_model.txt in LightGBM's native format
+    model.booster_.save_model('urban_sight_model.txt')
+    print("\nModel saved to 'urban_sight_model.txt'")
     
-    # 9. Plot feature importance bar chart, save as feature_importance.png
+    # 7. Plot feature importance bar chart, save as feature_importance.png
     importances = model.feature_importances_
     sorted_indices = np.argsort(importances)[::-1]
     
@@ -71,36 +61,14 @@ def train_model():
 def predict(raw_dict):
     """
     Accepts dict with all feature keys
-    Loads scaler.pkl and urban_sight_model.pkl
+    Uses the model loaded once by engine.py
     Returns: { "safety_score": float, "safety_pct": int, "category": "Low/Medium/High" }
     Thresholds: score < 0.4 = Low, 0.4-0.7 = Medium, > 0.7 = High
     """
-    # Load model and scaler
-    model = joblib.load('urban_sight_model.pkl')
-    scaler = joblib.load('scaler.pkl')
-    
-    # Convert dict to DataFrame to maintain column order/names
-    df_input = pd.DataFrame([raw_dict])
+    # Imported here so engine loads the model files written by train_model()
+    from engine import predict as engine_predict
     
-    expected_cols = ['hour', 'day_of_week', 'lighting_score', 'crowd_density', 
-                     'historical_crime_index', 'police_dist_km', 'is_isolated', 'near_transit']
-                     
-    # Ensure columns exist and order matches
-    X_input = df_input[expected_cols]
-    
-    # Transform
-    X_scaled = scaler.transform(X_input)
-    
-    # Predict
-    score = float(model.predict(X_scaled)[0])
-    
-    # Thresholds
-    if score < 0.4:
-        category = "Low"
-    elif score <= 0.7:
-        category = "Medium"
-    else:
-        category = "High"
+    score, category = engine_predict(raw_dict)
         
     safety_pct = int(round(score * 100))
     